@@ -1,157 +1,270 @@
+import json
+from dataclasses import dataclass
+
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
 import altair as alt
 import numpy as np
 
-# 1. Load Core Data
-events = pd.read_csv("events.csv", parse_dates=["Ann Date"])
-meta   = pd.read_csv("meta.csv",   parse_dates=["Ann Date"])
-ar     = pd.read_csv("ar.csv",     index_col=0)
-
-# Clean Surprise column
-meta["Surprise"] = pd.to_numeric(meta["Surprise"], errors="coerce")
-meta["Surprise"] = meta["Surprise"].replace([np.inf, -np.inf], np.nan)
-
-# 2. Build event_id & reindex meta
-events["event_id"] = events["Ticker"] + " | " + events["Ann Date"].dt.date.astype(str)
-meta["event_id"]   = meta["Ticker"]   + " | " + meta["Ann Date"].dt.date.astype(str)
-meta = meta.set_index("event_id")
-
-# 3. Prepare CAR windows
-car0  = ar["0"]
-car1  = ar[["-1","0","1"]].sum(axis=1)
-car11 = ar.loc[:, [str(i) for i in range(-5,6)]].sum(axis=1)
-windows = {
-    "CAR(0,0)"   : car0,
-    "CAR(-1,+1)" : car1,
-    "CAR(-5,+5)" : car11
+# CAR window label -> column of cars.parquet
+CAR_COLUMNS = {
+    "CAR(0,0)"   : "CAR_0",
+    "CAR(-1,+1)" : "CAR_1",
+    "CAR(-5,+5)" : "CAR_11"
+}
+
+# CAR window label -> (first, last) event day it spans
+CAR_DAYS = {
+    "CAR(0,0)"   : (0, 0),
+    "CAR(-1,+1)" : (-1, 1),
+    "CAR(-5,+5)" : (-5, 5)
 }
 
-# 4. Streamlit UI Setup
-st.title("Earnings-Announcement Dashboard")
-st.markdown(
-    "_Interactive earnings-announcement event-study. "
-    "Select a stock and CAR window to explore its earnings-driven returns._"
-)
-
-# 4.1 User Inputs
-col1, col2 = st.columns(2)
-with col1:
-    ticker = st.selectbox("Choose a ticker", sorted(events["Ticker"].unique()))
-with col2:
-    window = st.selectbox("Choose CAR window", list(windows.keys()))
-
-# 4.2 Filter Data for Selected Ticker
-car_series = windows[window]
-ev     = events[events["Ticker"] == ticker].sort_values("Ann Date")
-ar_sub = ar.loc[ev["event_id"].values]
-md     = meta.loc[ev["event_id"].values]
-
-# 4.3 Key Metrics Display
-st.subheader("Key Metrics")
-st.markdown("_Average & most recent abnormal returns around earnings._")
-st.markdown("Use these metrics to see typical earnings impact and how the latest event compares.")
-car_win       = car_series.loc[ev["event_id"]]
-avg_car       = car_win.mean()
-last_eid      = ev.iloc[-1]["event_id"]
-last_surprise = md.loc[last_eid, "Surprise"]
-last_car      = car_win.loc[last_eid]
-n_events      = len(ev)
-k1, k2, k3, k4 = st.columns(4)
-k1.metric(f"Avg {window}",  f"{avg_car:.2%}")
-k2.metric("Last Surprise",  f"{last_surprise:.1%}")
-k3.metric(f"Last {window}", f"{last_car:.2%}")
-k4.metric("# of Events",    f"{n_events}")
-
-# 5. Ranking Section
-st.subheader(f"Ranking: Average {window} by Ticker")
-st.markdown("Compare tickers by their average CAR to identify top and bottom performers.")
-df_rank = (
-    pd.DataFrame({"event_id": car_series.index, "CAR": car_series.values})
-      .merge(events[["event_id","Ticker"]], on="event_id")
-      .groupby("Ticker", as_index=False)["CAR"].mean()
-      .sort_values("CAR", ascending=False)
-)
-st.dataframe(
-    df_rank.rename(columns={"CAR": f"Avg {window}"})
-           .style.format({f"Avg {window}": "{:.1%}"})
-)
-
-# 6. Earnings History Table
-st.subheader("Earnings History")
-st.markdown("Review each past announcement’s date, surprise, and CAR in one table.")
-df_table = ev[["event_id","Ann Date"]].copy()
-df_table["Surprise"]   = df_table["event_id"].map(md["Surprise"])
-df_table["CAR(0,0)"]   = ar_sub["0"].values
-df_table["CAR(-1,+1)"] = car_series.loc[ev["event_id"]].values
-df_table["CAR(-5,+5)"] = ar_sub.loc[:, [str(i) for i in range(-5,6)]].sum(axis=1).values
-st.dataframe(
-    df_table
-      .sort_values("Ann Date", ascending=False)
-      .rename(columns={"Ann Date":"Date"})
-      .style.format({
-         "Surprise"   : "{:.1%}",
-         "CAR(0,0)"   : "{:.1%}",
-         "CAR(-1,+1)" : "{:.1%}",
-         "CAR(-5,+5)" : "{:.1%}"
-      }),
-    height=300
-)
-
-# 7. Latest AR Curve
-st.subheader("Latest AR Curve")
-st.markdown("Visualize the abnormal return trajectory around the most recent earnings date.")
-full_ar = ar_sub.loc[last_eid].astype(float)
-if window == "CAR(0,0)":
-    days = ["0"]
-elif window == "CAR(-1,+1)":
-    days = ["-1","0","1"]
-else:
-    days = [str(i) for i in range(-5,6)]
-df_curve = (
-    full_ar.loc[days]
-           .rename_axis("Day")
-           .reset_index(name="AR")
-           .assign(Day=lambda d: d.Day.astype(int))
-           .set_index("Day")
-)
-st.line_chart(df_curve)
-
-# 8. Surprise vs. CAR Scatter
-st.subheader("Surprise vs. Return")
-st.markdown("Inspect how EPS surprise correlates with the selected CAR window.")
-df_sc = pd.DataFrame({
-    "Surprise": md["Surprise"].values,
-    "CAR"     : car_win.values,
-    "Date"    : ev["Ann Date"].dt.date.values
-})
-scatter = alt.Chart(df_sc).mark_circle(size=60).encode(
-    x=alt.X("Surprise", title="EPS Surprise"),
-    y=alt.Y("CAR",      title=window),
-    tooltip=["Date","Surprise","CAR"]
-).interactive()
-st.altair_chart(scatter, use_container_width=True)
-
-# 9. Forecast Next Event CAR (using exported CSV only)
-st.subheader("Forecast Next Event CAR")
-st.markdown("Select a future event to view its predicted CAR and 95% confidence interval.")
-
-# Load only the predictions CSV and build event_id
-upcoming = pd.read_csv("upcoming_predictions.csv", parse_dates=["Ann Date"])
-upcoming["event_id"] = upcoming["Ticker"] + " | " + upcoming["Ann Date"].dt.date.astype(str)
-
-# User selects which future event to display
-choice = st.selectbox("Pick an upcoming event", upcoming["event_id"])
-sel    = upcoming.set_index("event_id").loc[choice]
-
-pred_car = sel["Pred_CAR_1"]
-ci_lo    = sel["CI_lower"]
-ci_hi    = sel["CI_upper"]
-
-# Show the precomputed values
-st.metric(
-    label = f"Predicted {window} for {choice}",
-    value = f"{pred_car:.2%}",
-    delta = None
-)
-st.write(f"95% CI: [{ci_lo:.2%}, {ci_hi:.2%}]")
+# Event day -> column of the AR matrix
+DAY_INDEX = {d: i for i, d in enumerate(range(-5, 6))}
+
+# Scatter points are capped below, so Altair's row limit check is redundant
+MAX_SCATTER_POINTS = 5000
+alt.data_transformers.disable_max_rows()
+
+# 1. Load Core Data (files written by prepare_data.py)
+def load_events():
+    return pd.read_parquet("events.parquet", dtype_backend="pyarrow")
+
+def load_meta():
+    meta = pd.read_parquet("meta.parquet", dtype_backend="pyarrow")
+    # Clean Surprise column
+    meta["Surprise"] = pd.to_numeric(meta["Surprise"], errors="coerce")
+    meta["Surprise"] = meta["Surprise"].replace([np.inf, -np.inf], np.nan)
+    return meta
+
+def load_ar():
+    # Daily ARs as a C-contiguous float32 (events x days) matrix, rows in event_id order.
+    # The array is a zero-copy view of the memory-mapped ar.arrow, so workers on one
+    # host share its pages.
+    source = pa.memory_map("ar.arrow", "r")
+    values = pa.ipc.open_file(source).get_batch(0).column("AR").flatten()
+    ar_mat = values.to_numpy(zero_copy_only=True).reshape(-1, len(DAY_INDEX))
+    assert ar_mat.flags["C_CONTIGUOUS"]
+    return ar_mat
+
+def load_cars():
+    return pd.read_parquet("cars.parquet", dtype_backend="pyarrow")
+
+def load_upcoming():
+    return pd.read_parquet("upcoming_predictions.parquet", dtype_backend="pyarrow")
+
+def load_ticker_rows():
+    # ticker -> slice of its row block, shared by events, meta, ar and cars
+    # (rows are sorted by ticker, then date)
+    with open("ticker_offsets.json") as f:
+        return {t: slice(lo, hi) for t, (lo, hi) in json.load(f).items()}
+
+# Everything the dashboard reads, built once per process and shared by all
+# sessions. Treat the contents as read-only.
+@dataclass(frozen=True)
+class Bundle:
+    events         : pd.DataFrame
+    meta           : pd.DataFrame
+    cars           : pd.DataFrame
+    upcoming       : pd.DataFrame
+    ar_mat         : np.ndarray
+    ticker_rows    : dict
+
+@st.cache_resource(show_spinner=False)
+def bundle():
+    return Bundle(
+        events         = load_events(),
+        meta           = load_meta(),
+        cars           = load_cars(),
+        upcoming       = load_upcoming(),
+        ar_mat         = load_ar(),
+        ticker_rows    = load_ticker_rows()
+    )
+
+# 2. Display labels ("Ticker | YYYY-MM-DD") for the packed int64 event_id keys
+def event_labels(tickers, dates):
+    days = np.datetime_as_string(pd.Series(dates).to_numpy(dtype="datetime64[D]")).astype(object)
+    return np.asarray(tickers, dtype=object) + " | " + days
+
+# Sorted ticker names for the picker
+@st.cache_data(show_spinner=False)
+def ticker_list():
+    return sorted(bundle().events["Ticker"].unique().tolist())
+
+# Labels for the upcoming-event picker; independent of ticker and window
+@st.cache_data(show_spinner=False)
+def upcoming_labels():
+    upcoming = bundle().upcoming
+    return dict(zip(upcoming.index, event_labels(upcoming["Ticker"], upcoming["Ann Date"])))
+
+# Section renderers. Each is cached on exactly the inputs it depends on, so a
+# ticker change only recomputes ticker-keyed sections and a window change only
+# window-keyed ones.
+
+# Average CAR per ticker, grouped on the dictionary-encoded Ticker column
+@st.cache_data(show_spinner=False)
+def render_ranking(window):
+    B = bundle()
+    ticker_by_eid = B.events.set_index("event_id")["Ticker"].astype("category")
+    car_series    = B.cars[CAR_COLUMNS[window]].astype("float64")
+    return (
+        car_series.groupby(ticker_by_eid, observed=True).mean()
+                  .sort_values(ascending=False)
+                  .rename_axis("Ticker")
+                  .reset_index(name=f"Avg {window}")
+    )
+
+# Earnings history for one ticker, newest first; the columns below are shown as percentages
+HISTORY_PCT_COLS = ["Surprise", "CAR(0,0)", "CAR(-1,+1)", "CAR(-5,+5)"]
+
+@st.cache_data(show_spinner=False)
+def render_history(ticker):
+    B = bundle()
+    rows = B.ticker_rows[ticker]
+    ev   = B.events.iloc[rows]
+    md   = B.meta.iloc[rows]
+    cars = B.cars.iloc[rows]
+    return pd.DataFrame({
+        "Event"      : event_labels(ticker, ev["Ann Date"]),
+        "Date"       : ev["Ann Date"].to_numpy(dtype="datetime64[ns]"),
+        "Surprise"   : md["Surprise"].to_numpy(dtype="float64", na_value=np.nan),
+        "CAR(0,0)"   : cars["CAR_0"].to_numpy(dtype="float64"),
+        "CAR(-1,+1)" : cars["CAR_1"].to_numpy(dtype="float64"),
+        "CAR(-5,+5)" : cars["CAR_11"].to_numpy(dtype="float64")
+    }).iloc[::-1].reset_index(drop=True)
+
+# Surprise/CAR pairs for every event under one window; sliced per ticker at render time
+@st.cache_data(show_spinner=False)
+def scatter_base(window):
+    B = bundle()
+    return pd.DataFrame({
+        "Surprise": B.meta["Surprise"].values,
+        "CAR"     : B.cars[CAR_COLUMNS[window]].values,
+        "Date"    : B.meta["Ann Date"].dt.date.values
+    })
+
+# Abnormal returns of the ticker's latest event over the window's days
+@st.cache_data(show_spinner=False)
+def render_curve(ticker, window):
+    B = bundle()
+    last    = B.ticker_rows[ticker].stop - 1
+    lo, hi  = CAR_DAYS[window]
+    return pd.DataFrame(
+        {"AR": B.ar_mat[last, DAY_INDEX[lo]:DAY_INDEX[hi] + 1].astype(float)},
+        index=pd.RangeIndex(lo, hi + 1, name="Day")
+    )
+
+@st.cache_data(show_spinner=False)
+def render_scatter(ticker, window):
+    df_sc = scatter_base(window).iloc[bundle().ticker_rows[ticker]]
+    if len(df_sc) > MAX_SCATTER_POINTS:
+        df_sc = df_sc.sample(MAX_SCATTER_POINTS, random_state=0)
+    # A clean RangeIndex keeps the pandas index out of the chart payload
+    df_sc = df_sc.reset_index(drop=True)
+    return alt.Chart(df_sc).mark_circle(size=60).encode(
+        x=alt.X("Surprise", title="EPS Surprise"),
+        y=alt.Y("CAR",      title=window),
+        tooltip=["Date","Surprise","CAR"]
+    ).interactive()
+
+
+def main():
+    B = bundle()
+    events = B.events
+    meta   = B.meta
+    cars   = B.cars
+    ticker_rows = B.ticker_rows
+
+    # 3. CAR windows (precomputed by prepare_data.py)
+    windows = {label: cars[col] for label, col in CAR_COLUMNS.items()}
+
+    # 4. Streamlit UI Setup
+    st.title("Earnings-Announcement Dashboard")
+    st.markdown(
+        "_Interactive earnings-announcement event-study. "
+        "Select a stock and CAR window to explore its earnings-driven returns._"
+    )
+
+    # 4.1 User Inputs
+    col1, col2 = st.columns(2)
+    with col1:
+        ticker = st.selectbox("Choose a ticker", ticker_list())
+    with col2:
+        window = st.selectbox("Choose CAR window", list(windows.keys()))
+
+    # 4.2 Filter Data for Selected Ticker
+    car_series = windows[window]
+    rows   = ticker_rows[ticker]
+    ev     = events.iloc[rows]   # already in date order
+    md     = meta.iloc[rows]
+
+    # 4.3 Key Metrics Display
+    st.subheader("Key Metrics")
+    st.markdown("_Average & most recent abnormal returns around earnings._")
+    st.markdown("Use these metrics to see typical earnings impact and how the latest event compares.")
+    car_win       = car_series.iloc[rows].astype("float64")
+    avg_car       = car_win.mean()
+    last_surprise = md["Surprise"].iloc[-1]
+    last_car      = car_win.iloc[-1]
+    n_events      = len(ev)
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric(f"Avg {window}",  f"{avg_car:.2%}")
+    k2.metric("Last Surprise",  "n/a" if pd.isna(last_surprise) else f"{last_surprise:.1%}")
+    k3.metric(f"Last {window}", f"{last_car:.2%}")
+    k4.metric("# of Events",    f"{n_events}")
+
+    # 5. Ranking Section
+    with st.expander(f"Ranking: Average {window} by Ticker"):
+        st.markdown("Compare tickers by their average CAR to identify top and bottom performers.")
+        st.dataframe(
+            render_ranking(window),
+            column_config={f"Avg {window}": st.column_config.NumberColumn(format="percent")}
+        )
+
+    # 6. Earnings History Table
+    with st.expander("Earnings History"):
+        st.markdown("Review each past announcement’s date, surprise, and CAR in one table.")
+        st.dataframe(
+            render_history(ticker),
+            height=300,
+            column_config={c: st.column_config.NumberColumn(format="percent") for c in HISTORY_PCT_COLS}
+        )
+
+    # 7. Latest AR Curve
+    with st.expander("Latest AR Curve"):
+        st.markdown("Visualize the abnormal return trajectory around the most recent earnings date.")
+        st.line_chart(render_curve(ticker, window))
+
+    # 8. Surprise vs. CAR Scatter
+    with st.expander("Surprise vs. Return"):
+        st.markdown("Inspect how EPS surprise correlates with the selected CAR window.")
+        st.altair_chart(render_scatter(ticker, window), use_container_width=True)
+
+    # 9. Forecast Next Event CAR (using exported CSV only)
+    with st.expander("Forecast Next Event CAR"):
+        st.markdown("Select a future event to view its predicted CAR and 95% confidence interval.")
+
+        # Precomputed predictions table (indexed by event_id)
+        upcoming = B.upcoming
+        labels   = upcoming_labels()
+
+        # User selects which future event to display
+        choice = st.selectbox("Pick an upcoming event", list(labels), format_func=labels.get)
+        sel    = upcoming.loc[choice]
+
+        pred_car = sel["Pred_CAR_1"]
+        ci_lo    = sel["CI_lower"]
+        ci_hi    = sel["CI_upper"]
+
+        # Show the precomputed values
+        st.metric(
+            label = f"Predicted {window} for {labels[choice]}",
+            value = f"{pred_car:.2%}",
+            delta = None
+        )
+        st.write(f"95% CI: [{ci_lo:.2%}, {ci_hi:.2%}]")
+
+
+main()
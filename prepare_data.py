@@ -0,0 +1,116 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as ft
+from pyarrow import csv as pacsv
+
+# One-shot conversion of the exported CSVs into the Parquet files read by app.py.
+# Re-run whenever the CSV exports are refreshed.
+
+def event_ids(tickers, dates, categories):
+    # Pack (ticker code, days since epoch) into one int64 join key
+    ticker_code = pd.Categorical(tickers, categories=categories).codes.astype("int64")
+    assert (ticker_code >= 0).all(), "ticker missing from the ticker list"
+    date_code   = np.asarray(dates, dtype="datetime64[D]").astype("int64")
+    return pd.Index((ticker_code << 32) | date_code, name="event_id")
+
+def drop_repeats(df, src):
+    # Keep one row per event_id; repeated rows must be exact copies
+    repeats = df[df.index.duplicated(keep=False)]
+    assert (repeats.groupby(level=0).nunique(dropna=False) <= 1).all().all(), \
+        f"conflicting rows for the same (Ticker, Ann Date) in {src}"
+    return df[~df.index.duplicated()]
+
+def read_csv(src):
+    # Multi-threaded Arrow CSV reader; announcement dates parsed as timestamps
+    table = pacsv.read_csv(
+        src,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(column_types={"Ann Date": pa.timestamp("s")})
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+def write(df, dst):
+    df.to_parquet(dst, engine="pyarrow", compression="zstd")
+    print(f"-> {dst}")
+
+# 1. Read the CSV exports
+events   = read_csv("events.csv")
+meta     = read_csv("meta.csv")
+ar       = read_csv("ar.csv").set_index("").rename_axis(None)
+upcoming = read_csv("upcoming_predictions.csv")
+
+# 2. Key every table by the packed event_id (string ids in ar.csv are "Ticker | YYYY-MM-DD")
+tickers    = sorted(set(events["Ticker"]) | set(upcoming["Ticker"]))
+ar_parts   = ar.index.to_series().str.split(" | ", n=1, expand=True, regex=False)
+ar_ticker  = ar_parts[0]
+ar_date    = pd.to_datetime(ar_parts[1])
+events.index   = event_ids(events["Ticker"], events["Ann Date"], tickers)
+meta.index     = event_ids(meta["Ticker"],   meta["Ann Date"],   tickers)
+ar.index       = event_ids(ar_ticker,        ar_date,            tickers)
+upcoming.index = event_ids(upcoming["Ticker"], upcoming["Ann Date"], tickers)
+
+# The history exports repeat one announcement, LIN 2019-08-05. Its events.csv and
+# ar.csv rows are exact copies, but meta.csv gives two different surprises
+# (+0.52% and -13.9%). Neither can be preferred, so that surprise is left missing;
+# any other conflicting repeat fails. Upcoming events must be unique.
+lin_conflict = event_ids(["LIN"], [pd.Timestamp("2019-08-05")], tickers)[0]
+meta.loc[meta.index == lin_conflict, "Surprise"] = pd.NA
+events   = drop_repeats(events, "events.csv").drop(columns="event_id").reset_index()
+meta     = drop_repeats(meta,   "meta.csv")
+ar       = drop_repeats(ar,     "ar.csv")
+assert upcoming.index.is_unique, "duplicate (Ticker, Ann Date) in upcoming_predictions.csv"
+
+# Sorting by event_id orders rows by (ticker, date), so each ticker is one
+# contiguous block at the same offsets in events, meta, ar and cars
+events = events.sort_values("event_id", ignore_index=True)
+meta   = meta.sort_index()
+ar     = ar.sort_index()
+assert meta.index.equals(ar.index) and (events["event_id"].to_numpy() == ar.index.to_numpy()).all()
+
+codes  = ar.index.to_numpy() >> 32
+starts = np.searchsorted(codes, np.arange(len(tickers)), side="left")
+stops  = np.searchsorted(codes, np.arange(len(tickers)), side="right")
+ticker_offsets = {t: [int(lo), int(hi)] for t, lo, hi in zip(tickers, starts, stops)}
+
+# 3. Precompute the CAR windows from a C-contiguous float32 (events x days) AR matrix
+DAY_COLS  = [str(d) for d in range(-5, 6)]
+DAY_INDEX = {d: i for i, d in enumerate(range(-5, 6))}
+ar_mat = np.ascontiguousarray(ar[DAY_COLS].to_numpy(dtype=np.float32, na_value=np.nan))
+assert ar_mat.flags["C_CONTIGUOUS"]
+
+def car(lo, hi):
+    # Row sums over days lo..hi (missing days skipped), accumulated in float64
+    block = ar_mat[:, DAY_INDEX[lo]:DAY_INDEX[hi] + 1]
+    return np.nansum(block, axis=1, dtype=np.float64).astype("float32")
+
+cars = pd.DataFrame({
+    "CAR_0"  : car(0, 0),
+    "CAR_1"  : car(-1, 1),
+    "CAR_11" : car(-5, 5),
+}, index=ar.index)
+
+# 4. Dictionary-encoded tickers
+events["Ticker"] = pd.Categorical(events["Ticker"], categories=tickers)
+meta["Ticker"]   = pd.Categorical(meta["Ticker"],   categories=tickers)
+
+# 5. Write Parquet
+write(events,   "events.parquet")
+write(meta,     "meta.parquet")
+write(cars,     "cars.parquet")
+write(upcoming, "upcoming_predictions.parquet")
+
+# The AR matrix goes to an uncompressed Arrow IPC file the app memory-maps. Stored as
+# one fixed-size-list column, its values buffer is the row-major matrix itself.
+ar_table = pa.table({
+    "event_id" : ar.index.to_numpy(),
+    "AR"       : pa.FixedSizeListArray.from_arrays(pa.array(ar_mat.ravel()), len(DAY_COLS)),
+})
+ft.write_feather(ar_table, "ar.arrow", compression="uncompressed", chunksize=len(ar_table))
+print("-> ar.arrow")
+
+with open("ticker_offsets.json", "w") as f:
+    json.dump(ticker_offsets, f, indent=1)
+print("-> ticker_offsets.json")